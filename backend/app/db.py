@@ -1,112 +1,175 @@
 import sqlite3
 import os
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, Optional, Tuple
 
 DB_PATH = os.environ.get("DEVIN_DB_PATH", str(Path(__file__).resolve().parent.parent / "devin.db"))
 
+# Connection tuning that is safe under WAL: fsync only at checkpoints, keep
+# temp tables and a 64 MiB page cache in memory, memory-map reads, and wait
+# on locks instead of failing with SQLITE_BUSY when pollers write concurrently.
+_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-65536;
+    PRAGMA mmap_size=268435456;
+    PRAGMA busy_timeout=5000;
+    PRAGMA foreign_keys=ON;
+"""
+
+
+# One shared writer serialised by a lock, plus one read-only connection per
+# thread. Under WAL the Flask handlers can read while the pollers write.
+_local = threading.local()
+_write_lock = threading.Lock()
+_write_conn: Optional[sqlite3.Connection] = None
+
+
+def _connect(database: str, **kwargs: Any) -> sqlite3.Connection:
+    conn = sqlite3.connect(database, **kwargs)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_PRAGMAS)
+    return conn
+
 
 def get_connection() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
+    """Return this thread's read-only connection, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _connect(f"{Path(DB_PATH).resolve().as_uri()}?mode=ro", uri=True)
+        _local.conn = conn
     return conn
 
 
+@contextmanager
+def _conn_ctx(write: bool = False) -> Iterator[sqlite3.Connection]:
+    """Yield a pooled connection.
+
+    Writes hold the writer lock and run in a BEGIN IMMEDIATE transaction,
+    which takes SQLite's RESERVED lock up front rather than upgrading from
+    a read lock mid-transaction, and commit on exit.
+    """
+    global _write_conn
+    if not write:
+        yield get_connection()
+        return
+
+    with _write_lock:
+        if _write_conn is None:
+            _write_conn = _connect(DB_PATH, check_same_thread=False, isolation_level=None)
+        with _write_conn:
+            _write_conn.execute("BEGIN IMMEDIATE")
+            yield _write_conn
+
+
 def init_db() -> None:
-    conn = get_connection()
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS devin_analyses (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            github_url TEXT NOT NULL,
-            issue_id INTEGER NOT NULL,
-            session_id TEXT,
-            status TEXT NOT NULL DEFAULT 'pending',
-            plan TEXT,
-            confidence_score INTEGER,
-            devin_url TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(github_url, issue_id)
+    # The write transaction is BEGIN IMMEDIATE, so concurrently starting
+    # workers don't race on the schema migration below.
+    with _conn_ctx(write=True) as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS devin_analyses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                github_url TEXT NOT NULL,
+                issue_id INTEGER NOT NULL,
+                session_id TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                plan TEXT,
+                confidence_score INTEGER,
+                devin_url TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(github_url, issue_id)
+            )
+        """)
+
+        # Add fix-tracking columns (idempotent for existing databases)
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(devin_analyses)")}
+        for col, col_type in [
+            ("fix_status", "TEXT"),
+            ("fix_session_id", "TEXT"),
+            ("fix_devin_url", "TEXT"),
+            ("pr_url", "TEXT"),
+        ]:
+            if col not in existing:
+                conn.execute(f"ALTER TABLE devin_analyses ADD COLUMN {col} {col_type}")
+
+        # Covering index for status lookups, so they never touch the row and
+        # its (possibly large) plan. SQLite prefers the UNIQUE autoindex on a
+        # full key match, so readers must name this index with INDEXED BY.
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_analysis_status ON devin_analyses("
+            "github_url, issue_id, status, fix_status, fix_session_id, fix_devin_url, pr_url)"
         )
-    """)
-    conn.commit()
 
-    # Add fix-tracking columns (idempotent for existing databases)
-    for col, col_type in [
-        ("fix_status", "TEXT"),
-        ("fix_session_id", "TEXT"),
-        ("fix_devin_url", "TEXT"),
-        ("pr_url", "TEXT"),
-    ]:
-        try:
-            conn.execute(f"ALTER TABLE devin_analyses ADD COLUMN {col} {col_type}")
-            conn.commit()
-        except Exception:
-            pass  # Column already exists
 
-    conn.close()
+def get_analysis(github_url: str, issue_id: int) -> Optional[Dict[str, Any]]:
+    with _conn_ctx() as conn:
+        row = conn.execute(
+            "SELECT * FROM devin_analyses WHERE github_url = ? AND issue_id = ?",
+            (github_url, issue_id),
+        ).fetchone()
+    if row is None:
+        return None
+    return dict(row)
 
 
-def get_analysis(github_url: str, issue_id: int) -> Optional[Dict[str, Any]]:
-    conn = get_connection()
-    row = conn.execute(
-        "SELECT * FROM devin_analyses WHERE github_url = ? AND issue_id = ?",
-        (github_url, issue_id),
-    ).fetchone()
-    conn.close()
+def get_status(github_url: str, issue_id: int) -> Optional[Dict[str, Any]]:
+    """Like get_analysis, but reads only the status and fix-tracking columns."""
+    with _conn_ctx() as conn:
+        row = conn.execute(
+            "SELECT github_url, issue_id, status, fix_status, fix_session_id, fix_devin_url, pr_url "
+            "FROM devin_analyses INDEXED BY idx_analysis_status "
+            "WHERE github_url = ? AND issue_id = ?",
+            (github_url, issue_id),
+        ).fetchone()
     if row is None:
         return None
     return dict(row)
 
 
-def upsert_analysis(github_url: str, issue_id: int, **kwargs: Any) -> None:
-    conn = get_connection()
-    existing = conn.execute(
-        "SELECT id FROM devin_analyses WHERE github_url = ? AND issue_id = ?",
-        (github_url, issue_id),
-    ).fetchone()
-
-    if existing:
-        update_fields = ", ".join(f"{k} = ?" for k in kwargs)
-        values = list(kwargs.values()) + [github_url, issue_id]
-        conn.execute(
-            f"UPDATE devin_analyses SET {update_fields}, updated_at = CURRENT_TIMESTAMP "
-            f"WHERE github_url = ? AND issue_id = ?",
-            values,
-        )
-    else:
-        fields = ["github_url", "issue_id"] + list(kwargs.keys())
-        placeholders = ", ".join("?" for _ in fields)
-        col_names = ", ".join(fields)
-        values = [github_url, issue_id] + list(kwargs.values())
-        conn.execute(
-            f"INSERT INTO devin_analyses ({col_names}) VALUES ({placeholders})",
-            values,
-        )
+@lru_cache(maxsize=32)
+def _upsert_sql(columns: Tuple[str, ...]) -> str:
+    fields = ("github_url", "issue_id") + columns
+    placeholders = ", ".join("?" for _ in fields)
+    col_names = ", ".join(fields)
+    update_fields = "".join(f"{c} = excluded.{c}, " for c in columns)
+    return (
+        f"INSERT INTO devin_analyses ({col_names}) VALUES ({placeholders}) "
+        f"ON CONFLICT(github_url, issue_id) DO UPDATE SET "
+        f"{update_fields}updated_at = CURRENT_TIMESTAMP"
+    )
 
-    conn.commit()
-    conn.close()
 
+def upsert_analysis(github_url: str, issue_id: int, **kwargs: Any) -> None:
+    columns = tuple(sorted(kwargs))
+    values = [github_url, issue_id] + [kwargs[c] for c in columns]
+    with _conn_ctx(write=True) as conn:
+        conn.execute(_upsert_sql(columns), values)
 
-def update_analysis(github_url: str, issue_id: int, **kwargs: Any) -> None:
-    conn = get_connection()
-    update_fields = ", ".join(f"{k} = ?" for k in kwargs)
-    values = list(kwargs.values()) + [github_url, issue_id]
-    conn.execute(
+
+@lru_cache(maxsize=32)
+def _update_sql(columns: Tuple[str, ...]) -> str:
+    update_fields = ", ".join(f"{c} = ?" for c in columns)
+    return (
         f"UPDATE devin_analyses SET {update_fields}, updated_at = CURRENT_TIMESTAMP "
-        f"WHERE github_url = ? AND issue_id = ?",
-        values,
+        f"WHERE github_url = ? AND issue_id = ?"
     )
-    conn.commit()
-    conn.close()
+
+
+def update_analysis(github_url: str, issue_id: int, **kwargs: Any) -> None:
+    columns = tuple(sorted(kwargs))
+    values = [kwargs[c] for c in columns] + [github_url, issue_id]
+    with _conn_ctx(write=True) as conn:
+        conn.execute(_update_sql(columns), values)
 
 
 def delete_analysis(github_url: str, issue_id: int) -> None:
-    conn = get_connection()
-    conn.execute(
-        "DELETE FROM devin_analyses WHERE github_url = ? AND issue_id = ?",
-        (github_url, issue_id),
-    )
-    conn.commit()
-    conn.close()
+    with _conn_ctx(write=True) as conn:
+        conn.execute(
+            "DELETE FROM devin_analyses WHERE github_url = ? AND issue_id = ?",
+            (github_url, issue_id),
+        )
@@ -1,127 +1,218 @@
-import json
+import asyncio
 import logging
 import os
-import re
-import time
 import threading
-from typing import Any, Callable, Dict, List, Optional, Tuple
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Set, Tuple
 
-import requests
+import httpx
+import orjson
 
 from app.db import update_analysis
 
 logger = logging.getLogger(__name__)
 
 DEVIN_API_BASE = "https://api.devin.ai/v1"
-POLL_INTERVAL = 15
+# Poll quickly at first so short sessions finish promptly, then back off
+# while the session stays in the same state. Any state change resets it.
+# When PUBLIC_URL is set, Devin's webhook wakes the poller early, so the
+# backoff is only a fallback.
+POLL_INITIAL_DELAY = 2.0
+POLL_MAX_DELAY = 60.0
+POLL_BACKOFF = 1.5
 
 STRUCTURED_OUTPUT_SCHEMA = {
     "plan": "A detailed, step-by-step implementation plan to resolve the issue",
     "confidence_score": 7,
 }
+_SCHEMA_JSON = orjson.dumps(STRUCTURED_OUTPUT_SCHEMA, option=orjson.OPT_INDENT_2).decode()
+
+
+# Per-session events that cut a poller's sleep short, either to poll right
+# away (webhook) or to stop (session id also in _cancelled). Events are only
+# created and touched on the poller loop: before Python 3.10 an
+# asyncio.Event binds to the loop current where it is constructed.
+# _polling holds every session with a scheduled or running poller, so a
+# cancel issued before the poller starts still reaches it.
+_wake_events: Dict[str, asyncio.Event] = {}
+_polling: Set[str] = set()
+_cancelled: Set[str] = set()
+
+# Last ETag and body per (session, light) fetch, for If-None-Match polling
+_session_cache: Dict[Tuple[str, bool], Tuple[str, Dict[str, Any]]] = {}
 
+# All pollers run as tasks on one event loop in a background thread
+_poll_loop: Optional[asyncio.AbstractEventLoop] = None
+_poll_loop_lock = threading.Lock()
 
-def _headers() -> Dict[str, str]:
-    token = os.environ.get("DEVIN_API_KEY", "")
-    return {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-    }
+
+# Bound once at import; refresh_credentials() re-reads the environment
+_HEADERS = {
+    "Authorization": f"Bearer {os.environ.get('DEVIN_API_KEY', '')}",
+    "Content-Type": "application/json",
+}
+
+
+# Shared keep-alive HTTP/2 pools so calls reuse the TLS connection to the
+# Devin API: an httpx.Client for the request handlers and an AsyncClient for
+# the pollers. Auth headers live on both; call refresh_credentials() after
+# changing DEVIN_API_KEY. Neither gets a custom transport, which would stop
+# httpx honouring HTTPS_PROXY / NO_PROXY, so retries live in _request().
+_CLIENT = httpx.Client(
+    http2=True,
+    headers=_HEADERS,
+    limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+    timeout=30,
+)
+_ASYNC_CLIENT = httpx.AsyncClient(
+    http2=True,
+    headers=_HEADERS,
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=64),
+    timeout=30,
+)
+
+
+def refresh_credentials() -> None:
+    """Re-read DEVIN_API_KEY and apply it to both HTTP clients."""
+    _HEADERS["Authorization"] = f"Bearer {os.environ.get('DEVIN_API_KEY', '')}"
+    _CLIENT.headers.update(_HEADERS)
+    _ASYNC_CLIENT.headers.update(_HEADERS)
+
+
+# Retry idempotent calls on rate limits and transient 5xx. POST is only
+# retried when the connection failed, since then nothing was sent; after a
+# response, a repeated POST /sessions could start a duplicate Devin session.
+_RETRY_METHODS = frozenset({"GET", "DELETE"})
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_RETRY_ATTEMPTS = 5
+_RETRY_BACKOFF = 0.3
+
+
+def _request(method: str, url: str, **kwargs: Any) -> httpx.Response:
+    """Send on the shared client, backing off (or honouring Retry-After) between retries."""
+    last_attempt = _RETRY_ATTEMPTS - 1
+    for attempt in range(_RETRY_ATTEMPTS):
+        try:
+            resp = _CLIENT.request(method, url, **kwargs)
+        except httpx.ConnectError:
+            if attempt == last_attempt:
+                raise
+            time.sleep(_RETRY_BACKOFF * 2 ** attempt)
+            continue
+        if (
+            method not in _RETRY_METHODS
+            or resp.status_code not in _RETRY_STATUSES
+            or attempt == last_attempt
+        ):
+            break
+        retry_after = resp.headers.get("Retry-After", "")
+        time.sleep(int(retry_after) if retry_after.isdigit() else _RETRY_BACKOFF * 2 ** attempt)
+    return resp
+
+
+# Static prompt text is assembled once; only the issue details vary per call.
+# The schema braces are doubled so str.format leaves them intact.
+_PROMPT_TEMPLATE = (
+    "Analyze the GitHub repository at {github_url} and specifically issue #{issue_id}: "
+    '"{issue_title}". '
+    "Review the codebase and the issue, then provide:\n"
+    "1. A detailed implementation plan to resolve this issue\n"
+    "2. A confidence score from 1-10 on how likely this plan will succeed\n\n"
+    "IMPORTANT: Your final message MUST be ONLY valid JSON with no other text, "
+    "no markdown fences, and no explanation. Use this exact schema:\n"
+    + _SCHEMA_JSON.replace("{", "{{").replace("}", "}}") + "\n\n"
+    "Where:\n"
+    '- "plan" is a string with your detailed step-by-step implementation plan\n'
+    '- "confidence_score" is an integer from 1 to 10\n\n'
+    "Return ONLY the JSON object as your final message. Nothing else."
+)
 
 
 def build_prompt(github_url: str, issue_id: int, issue_title: str) -> str:
-    schema_json = json.dumps(STRUCTURED_OUTPUT_SCHEMA, indent=2)
-    return (
-        f"Analyze the GitHub repository at {github_url} and specifically issue #{issue_id}: "
-        f'"{issue_title}". '
-        "Review the codebase and the issue, then provide:\n"
-        "1. A detailed implementation plan to resolve this issue\n"
-        "2. A confidence score from 1-10 on how likely this plan will succeed\n\n"
-        "IMPORTANT: Your final message MUST be ONLY valid JSON with no other text, "
-        "no markdown fences, and no explanation. Use this exact schema:\n"
-        f"{schema_json}\n\n"
-        "Where:\n"
-        '- "plan" is a string with your detailed step-by-step implementation plan\n'
-        '- "confidence_score" is an integer from 1 to 10\n\n'
-        "Return ONLY the JSON object as your final message. Nothing else."
+    return _PROMPT_TEMPLATE.format_map(
+        {"github_url": github_url, "issue_id": issue_id, "issue_title": issue_title}
     )
 
 
 def create_session(prompt: str) -> Tuple[str, str]:
-    resp = requests.post(
-        f"{DEVIN_API_BASE}/sessions",
-        headers=_headers(),
-        json={"prompt": prompt},
-        timeout=30,
-    )
+    body: Dict[str, Any] = {"prompt": prompt}
+    public_url = os.environ.get("PUBLIC_URL")
+    if public_url:
+        body["callback_url"] = f"{public_url.rstrip('/')}/api/devin/webhook"
+    resp = _request("POST", f"{DEVIN_API_BASE}/sessions", json=body)
     resp.raise_for_status()
-    data = resp.json()
+    data = orjson.loads(resp.content)
     return data.get("session_id"), data.get("url", "")
 
 
-def get_session(session_id: str) -> Dict[str, Any]:
-    resp = requests.get(
+async def get_session(session_id: str, *, light: bool = False) -> Dict[str, Any]:
+    """Fetch a session. light=True asks for status_enum only, for routine polls."""
+    # Poll conditionally: an unchanged session comes back as an empty 304
+    key = (session_id, light)
+    cached = _session_cache.get(key)
+    resp = await _ASYNC_CLIENT.get(
         f"{DEVIN_API_BASE}/sessions/{session_id}",
-        headers=_headers(),
-        timeout=30,
+        params={"fields": "status_enum"} if light else None,
+        headers={"If-None-Match": cached[0]} if cached else None,
     )
+    if cached and resp.status_code == 304:
+        return cached[1]
     resp.raise_for_status()
-    return resp.json()
+    data = orjson.loads(resp.content)
+    etag = resp.headers.get("ETag")
+    if etag:
+        _session_cache[key] = (etag, data)
+    return data
 
 
 def terminate_session(session_id: str) -> None:
+    cancel_polling(session_id)
     try:
-        resp = requests.delete(
-            f"{DEVIN_API_BASE}/sessions/{session_id}",
-            headers=_headers(),
-            timeout=30,
-        )
+        resp = _request("DELETE", f"{DEVIN_API_BASE}/sessions/{session_id}")
         resp.raise_for_status()
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error("Error terminating session %s: %s", session_id, e)
 
 
-def _extract_devin_message(messages: List[Dict[str, Any]]) -> Optional[str]:
+def _extract_devin_message(messages: Sequence[Dict[str, Any]]) -> Optional[str]:
     """Extract the last Devin message text from a list of session messages."""
     if not messages:
         return None
 
-    devin_text = ""
-    for msg in reversed(messages):
-        if msg.get("type") == "devin":
-            devin_text = msg.get("message", "")
-            break
-
-    if not devin_text:
-        devin_text = messages[-1].get("message", "")
+    # Devin's reply is almost always among the last few entries, so scan
+    # from the end and stop at the first match.
+    devin_text = next(
+        (m.get("message", "") for m in reversed(messages) if m.get("type") == "devin"),
+        "",
+    ) or messages[-1].get("message", "")
 
     if not devin_text:
         return None
 
     stripped = devin_text.strip()
     if stripped.startswith("```"):
-        stripped = re.sub(r"^```(?:json)?\s*\n?", "", stripped)
-        stripped = re.sub(r"\n?```\s*$", "", stripped)
+        stripped = stripped[3:]
+        if stripped.startswith("json"):
+            stripped = stripped[4:]
+        stripped = stripped.lstrip().removesuffix("```").rstrip()
 
     return stripped
 
 
-def _get_session_messages(session: Dict[str, Any]) -> List[Dict[str, Any]]:
+def _get_session_messages(session: Dict[str, Any]) -> Sequence[Dict[str, Any]]:
     """Extract messages from a session response, preferring structured output."""
-    structured_output = session.get("structured_output") or {}
-    messages = structured_output.get("messages", [])
-    if not messages:
-        messages = session.get("messages", [])
-    return messages
+    structured_output = session.get("structured_output")
+    return (structured_output and structured_output.get("messages")) or session.get("messages") or ()
 
 
-def parse_devin_response(messages: List[Dict[str, Any]]) -> Tuple[Optional[str], Optional[int]]:
+def parse_devin_response(messages: Sequence[Dict[str, Any]]) -> Tuple[Optional[str], Optional[int]]:
     text = _extract_devin_message(messages)
     if text is None:
         return None, None
 
     try:
-        data = json.loads(text)
+        data = orjson.loads(text)
         plan = data.get("plan")
         confidence = data.get("confidence_score")
         if isinstance(confidence, int):
@@ -129,62 +220,145 @@ def parse_devin_response(messages: List[Dict[str, Any]]) -> Tuple[Optional[str],
         else:
             confidence = None
         return plan, confidence
-    except (json.JSONDecodeError, AttributeError):
+    except (orjson.JSONDecodeError, AttributeError):
         return text, None
 
 
-def parse_fix_response(messages: List[Dict[str, Any]]) -> Optional[str]:
+def parse_fix_response(messages: Sequence[Dict[str, Any]]) -> Optional[str]:
     text = _extract_devin_message(messages)
     if text is None:
         return None
 
     try:
-        data = json.loads(text)
+        data = orjson.loads(text)
         return data.get("pr_url")
-    except (json.JSONDecodeError, AttributeError):
+    except (orjson.JSONDecodeError, AttributeError):
         return None
 
 
-def _poll_session(
+def _get_poll_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared poller event loop, starting its thread on first use."""
+    global _poll_loop
+    with _poll_loop_lock:
+        if _poll_loop is None:
+            _poll_loop = asyncio.new_event_loop()
+            threading.Thread(target=_poll_loop.run_forever, name="devin-poller", daemon=True).start()
+        return _poll_loop
+
+
+def _set_wake_event(session_id: str) -> None:
+    event = _wake_events.get(session_id)
+    if event is not None:
+        event.set()
+
+
+def wake_poller(session_id: str) -> None:
+    """Make the poller for a session check it now instead of after its delay."""
+    if session_id in _polling:
+        _get_poll_loop().call_soon_threadsafe(_set_wake_event, session_id)
+
+
+def cancel_polling(session_id: str) -> None:
+    """Wake the poller for a session and make it stop without writing a result."""
+    if session_id in _polling:
+        _cancelled.add(session_id)
+        wake_poller(session_id)
+
+
+async def _wait_woken(wake: asyncio.Event, timeout: float) -> bool:
+    """Sleep for up to timeout seconds; return True if woken early."""
+    try:
+        await asyncio.wait_for(wake.wait(), timeout)
+    except asyncio.TimeoutError:
+        return False
+    wake.clear()
+    return True
+
+
+async def _poll_session(
     session_id: str,
     github_url: str,
     issue_id: int,
-    on_complete: Callable[[List[Dict[str, Any]]], None],
+    on_complete: Callable[[Sequence[Dict[str, Any]]], None],
     on_stopped: Callable[[], None],
     on_error: Callable[[Exception], None],
     status_key: str,
 ) -> None:
-    """Shared polling loop for both analysis and fix sessions."""
-    try:
-        update_analysis(github_url, issue_id, **{status_key: "analyzing"})
+    """Shared polling loop for both analysis and fix sessions.
 
-        while True:
-            time.sleep(POLL_INTERVAL)
+    Each session costs at most two writes: "analyzing" the first time Devin
+    reports it running, and one terminal write from the callbacks. Blocking
+    work (DB writes, the sync DELETE) is pushed off the event loop.
+    """
+    wake = _wake_events.setdefault(session_id, asyncio.Event())
+    try:
+        delay = POLL_INITIAL_DELAY
+        last_status = None
+        last_written: Optional[str] = None
+        # A cancelled poller returns without writing: its row may already
+        # have been deleted, or recreated for a new session.
+        while session_id not in _cancelled:
+            await _wait_woken(wake, delay)
+            if session_id in _cancelled:
+                break
 
             try:
-                session = get_session(session_id)
-            except requests.RequestException as e:
+                session = await get_session(session_id, light=True)
+                status = session.get("status_enum", "")
+                # Only a terminal session needs its messages; skip the
+                # refetch if the API ignored the sparse fieldset.
+                if status in ("blocked", "finished") and not (
+                    "messages" in session or "structured_output" in session
+                ):
+                    session = await get_session(session_id)
+            except httpx.HTTPError as e:
                 logger.warning("Error polling session %s: %s", session_id, e)
+                delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
                 continue
 
-            status = session.get("status_enum", "")
+            # Cancelled while the request was in flight
+            if session_id in _cancelled:
+                break
 
             if status in ("blocked", "finished"):
                 messages = _get_session_messages(session)
-                on_complete(messages)
-                terminate_session(session_id)
+                await asyncio.to_thread(on_complete, messages)
+                # Finished sessions are already torn down by Devin; only
+                # blocked ones are still holding resources.
+                if status == "blocked":
+                    await asyncio.to_thread(terminate_session, session_id)
                 return
 
             if status == "stopped":
-                on_stopped()
+                await asyncio.to_thread(on_stopped)
                 return
 
+            # Only write when the stored status would actually change
+            if last_written != "analyzing":
+                await asyncio.to_thread(
+                    update_analysis, github_url, issue_id, **{status_key: "analyzing"}
+                )
+                last_written = "analyzing"
+
+            if status != last_status:
+                last_status = status
+                delay = POLL_INITIAL_DELAY
+            else:
+                delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
+
     except Exception as e:
         logger.error("Polling error for session %s: %s", session_id, e)
-        on_error(e)
+        if session_id not in _cancelled:
+            await asyncio.to_thread(on_error, e)
+    finally:
+        _polling.discard(session_id)
+        _wake_events.pop(session_id, None)
+        _cancelled.discard(session_id)
+        _session_cache.pop((session_id, True), None)
+        _session_cache.pop((session_id, False), None)
 
 
-def poll_session(session_id: str, github_url: str, issue_id: int) -> None:
+async def poll_session(session_id: str, github_url: str, issue_id: int) -> None:
     def on_complete(messages):
         plan, confidence = parse_devin_response(messages)
         update_analysis(
@@ -208,10 +382,10 @@ def poll_session(session_id: str, github_url: str, issue_id: int) -> None:
             plan=f"Error during analysis: {str(e)}",
         )
 
-    _poll_session(session_id, github_url, issue_id, on_complete, on_stopped, on_error, "status")
+    await _poll_session(session_id, github_url, issue_id, on_complete, on_stopped, on_error, "status")
 
 
-def poll_fix_session(session_id: str, github_url: str, issue_id: int) -> None:
+async def poll_fix_session(session_id: str, github_url: str, issue_id: int) -> None:
     def on_complete(messages):
         pr_url = parse_fix_response(messages)
         update_analysis(github_url, issue_id, fix_status="completed", pr_url=pr_url)
@@ -222,41 +396,59 @@ def poll_fix_session(session_id: str, github_url: str, issue_id: int) -> None:
     def on_error(_e):
         update_analysis(github_url, issue_id, fix_status="failed")
 
-    _poll_session(session_id, github_url, issue_id, on_complete, on_stopped, on_error, "fix_status")
+    await _poll_session(session_id, github_url, issue_id, on_complete, on_stopped, on_error, "fix_status")
 
 
-def _start_polling_thread(target: Callable[..., None], session_id: str, github_url: str, issue_id: int) -> threading.Thread:
-    thread = threading.Thread(
-        target=target,
-        args=(session_id, github_url, issue_id),
-        daemon=True,
+def _start_polling(
+    target: Callable[[str, str, int], Awaitable[None]], session_id: str, github_url: str, issue_id: int
+) -> Future:
+    # Register before scheduling so an early cancel isn't lost; the wake
+    # event itself is created by the poller on its own loop
+    _polling.add(session_id)
+    future = asyncio.run_coroutine_threadsafe(
+        target(session_id, github_url, issue_id), _get_poll_loop()
     )
-    thread.start()
-    return thread
-
-
-def start_polling_thread(session_id: str, github_url: str, issue_id: int) -> threading.Thread:
-    return _start_polling_thread(poll_session, session_id, github_url, issue_id)
+    future.add_done_callback(lambda f: _log_poller_exit(session_id, f))
+    return future
+
+
+def _log_poller_exit(session_id: str, future: Future) -> None:
+    # Callers drop the future, so anything that escapes the poller (e.g. the
+    # on_error write itself failing) would otherwise vanish with it
+    if future.cancelled():
+        return
+    exc = future.exception()
+    if exc is not None:
+        logger.error("Poller for session %s died: %r", session_id, exc, exc_info=exc)
+
+
+def start_polling_thread(session_id: str, github_url: str, issue_id: int) -> Future:
+    return _start_polling(poll_session, session_id, github_url, issue_id)
+
+
+_FIX_PROMPT_TEMPLATE = (
+    "You are tasked with fixing a GitHub issue.\n\n"
+    "Repository: {github_url}\n"
+    "Issue #{issue_id}: \"{issue_title}\"\n\n"
+    "Implementation plan:\n{plan}\n\n"
+    "Instructions:\n"
+    "1. Clone the repository and create a new branch for the fix\n"
+    "2. Implement the fix following the plan above\n"
+    "3. Commit your changes and push the branch\n"
+    "4. Open a pull request that references issue #{issue_id}\n\n"
+    "IMPORTANT: Your final message MUST be ONLY valid JSON with no other text, "
+    "no markdown fences, and no explanation. Use this exact schema:\n"
+    '{{"pr_url": "https://github.com/owner/repo/pull/123"}}\n\n'
+    "Where pr_url is the URL of the pull request you created.\n"
+    "Return ONLY the JSON object as your final message. Nothing else."
+)
 
 
 def build_fix_prompt(github_url: str, issue_id: int, issue_title: str, plan: str) -> str:
-    return (
-        f"You are tasked with fixing a GitHub issue.\n\n"
-        f"Repository: {github_url}\n"
-        f"Issue #{issue_id}: \"{issue_title}\"\n\n"
-        f"Implementation plan:\n{plan}\n\n"
-        "Instructions:\n"
-        "1. Clone the repository and create a new branch for the fix\n"
-        "2. Implement the fix following the plan above\n"
-        "3. Commit your changes and push the branch\n"
-        "4. Open a pull request that references issue #{issue_id}\n\n"
-        "IMPORTANT: Your final message MUST be ONLY valid JSON with no other text, "
-        "no markdown fences, and no explanation. Use this exact schema:\n"
-        '{"pr_url": "https://github.com/owner/repo/pull/123"}\n\n'
-        "Where pr_url is the URL of the pull request you created.\n"
-        "Return ONLY the JSON object as your final message. Nothing else."
+    return _FIX_PROMPT_TEMPLATE.format_map(
+        {"github_url": github_url, "issue_id": issue_id, "issue_title": issue_title, "plan": plan}
     )
 
 
-def start_fix_polling_thread(session_id: str, github_url: str, issue_id: int) -> threading.Thread:
-    return _start_polling_thread(poll_fix_session, session_id, github_url, issue_id)
+def start_fix_polling_thread(session_id: str, github_url: str, issue_id: int) -> Future:
+    return _start_polling(poll_fix_session, session_id, github_url, issue_id)
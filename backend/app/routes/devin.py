@@ -1,12 +1,14 @@
 from typing import Any, Dict, Optional, Tuple, Union
 
-from app.db import get_analysis, upsert_analysis, update_analysis, delete_analysis as db_delete_analysis
+from app.db import get_analysis, get_status, upsert_analysis, update_analysis, delete_analysis as db_delete_analysis
 from app.devin_client import (
     build_prompt,
     build_fix_prompt,
+    cancel_polling,
     create_session,
     start_polling_thread,
     start_fix_polling_thread,
+    wake_poller,
 )
 from app.routes.issues import normalize_github_url
 
@@ -82,7 +84,7 @@ def fix_issue(body: Dict[str, Any]) -> ResponseWithStatus:
     issue_title = body.get("issue_title", f"Issue #{issue_id}")
     plan = body["plan"]
 
-    existing = get_analysis(github_url, issue_id)
+    existing = get_status(github_url, issue_id)
     if existing and existing.get("fix_status") in ("pending", "analyzing"):
         return {
             "session_id": existing.get("fix_session_id"),
@@ -117,7 +119,7 @@ def fix_issue(body: Dict[str, Any]) -> ResponseWithStatus:
 
 def get_fix_status(github_url: str, issue_id: int) -> Dict[str, Any]:
     github_url = normalize_github_url(github_url) or github_url
-    analysis = get_analysis(github_url, issue_id)
+    analysis = get_status(github_url, issue_id)
     if analysis is None or analysis.get("fix_status") is None:
         return {
             "github_url": github_url,
@@ -142,4 +144,16 @@ def remove_analysis(github_url: str, issue_id: int) -> ResponseWithStatus:
         return {"error": "Analysis not found"}, 404
 
     db_delete_analysis(github_url, issue_id)
+
+    # Stop any pollers still waiting on this issue's sessions
+    for session_id in (analysis["session_id"], analysis.get("fix_session_id")):
+        if session_id:
+            cancel_polling(session_id)
+    return None, 204
+
+
+def devin_webhook(body: Dict[str, Any]) -> ResponseWithStatus:
+    # The callback only wakes the poller, which then fetches the session
+    # itself; the payload is never trusted to update the database directly.
+    wake_poller(body["session_id"])
     return None, 204
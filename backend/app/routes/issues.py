@@ -1,79 +1,189 @@
 import logging
 import os
 import re
-from typing import Dict, List, Optional, Tuple, Union
-from urllib.parse import urlparse
-
-from github import Github, GithubException
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import IO, Any, Callable, Dict, List, Optional, Tuple, Union
+
+import ijson
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
-GITHUB_URL_RE = re.compile(r'^https?://github\.com/[^/]+/[^/]+')
+# Hostnames are case-insensitive, and www.github.com redirects to github.com
+GITHUB_URL_RE = re.compile(r'^(?i:https?://(?:www\.)?github\.com)/(?P<owner>[^/]+)/(?P<repo>[^/?#]+)')
+GITHUB_API_BASE = "https://api.github.com"
+# GitHub caps per_page at 100, which matches our issue limit: one request
+ISSUES_LIMIT = 100
+
+# Runs the repo and issue-list requests side by side
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="github")
+
+# GitHub responses by (auth, path, params): (etag, body, fresh_until).
+# Fresh entries are served without a request; stale ones are revalidated
+# with If-None-Match, and a 304 costs no rate limit. Keying on the auth
+# header keeps one token's responses from being served to another. The
+# executor threads share the cache, so every access holds _cache_lock.
+CACHE_TTL = 60
+CACHE_MAX_ENTRIES = 256
+_cache: Dict[Tuple[str, str, Tuple[Tuple[str, Any], ...]], Tuple[str, Any, float]] = {}
+_cache_lock = threading.Lock()
 
 
 def normalize_github_url(url: str) -> Optional[str]:
     """Normalize a GitHub URL to https://github.com/owner/repo."""
-    parsed = urlparse(url)
-    path_parts = [p for p in parsed.path.strip("/").split("/") if p]
-    if len(path_parts) < 2:
+    match = GITHUB_URL_RE.match(url)
+    if not match:
         return None
-    return f"https://github.com/{path_parts[0]}/{path_parts[1]}"
+    return "https://github.com/{}/{}".format(*match.group("owner", "repo"))
+
+
+@lru_cache(maxsize=1)
+def _github_session(token: str) -> requests.Session:
+    """Shared keep-alive session for api.github.com, rebuilt if the token changes."""
+    session = requests.Session()
+    session.headers.update({
+        "Authorization": f"token {token}",
+        "Accept": "application/vnd.github+json",
+    })
+    # Back off on rate limits (honouring Retry-After) and transient 5xx
+    session.mount("https://", HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(
+            total=5,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        ),
+    ))
+    return session
+
+
+def _get_json(
+    session: requests.Session,
+    path: str,
+    parse: Optional[Callable[[IO[bytes]], Any]] = None,
+    **params: Any,
+) -> Any:
+    """GET a GitHub API path through the cache.
+
+    With ``parse``, the body is streamed to it instead of being read whole,
+    and its return value is what gets cached.
+    """
+    key = (session.headers["Authorization"], path, tuple(sorted(params.items())))
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached and cached[2] > time.monotonic():
+        return cached[1]
+
+    with session.get(
+        f"{GITHUB_API_BASE}{path}",
+        params=params,
+        headers={"If-None-Match": cached[0]} if cached else None,
+        timeout=30,
+        stream=parse is not None,
+    ) as resp:
+        if cached and resp.status_code == 304:
+            body = cached[1]
+        else:
+            if not resp.ok:
+                # Load the error body while the stream is still open, so the
+                # caller can read GitHub's message from the HTTPError
+                _ = resp.content
+            resp.raise_for_status()
+            if parse is None:
+                body = orjson.loads(resp.content)
+            else:
+                resp.raw.decode_content = True  # undo gzip before parsing
+                body = parse(resp.raw)
+
+    etag = resp.headers.get("ETag")
+    if etag:
+        with _cache_lock:
+            _cache[key] = (etag, body, time.monotonic() + CACHE_TTL)
+            if len(_cache) > CACHE_MAX_ENTRIES:
+                _cache.pop(next(iter(_cache)))  # evict the oldest entry
+    return body
+
+
+def _isoformat(timestamp: str) -> str:
+    """Render GitHub's UTC "...Z" timestamps as datetime.isoformat() does ("+00:00")."""
+    if timestamp.endswith("Z"):
+        return timestamp[:-1] + "+00:00"
+    return timestamp
+
+
+def _issue_row(issue: Dict[str, Any]) -> Dict[str, Any]:
+    user = issue.get('user')
+    return {
+        'issue_id': issue['number'],
+        'issue_title': issue['title'],
+        'body': issue.get('body') or '',
+        'state': issue['state'],
+        'author': user['login'] if user else 'unknown',
+        'author_avatar': user['avatar_url'] if user else '',
+        'labels': [{'name': l['name'], 'color': l['color']} for l in issue.get('labels', ())],
+        'created_at': _isoformat(issue.get('created_at') or ''),
+        'comment_count': issue.get('comments', 0),
+    }
+
+
+def _parse_issues(stream: IO[bytes]) -> List[Dict[str, Any]]:
+    """Build issue rows one array item at a time, skipping pull requests."""
+    rows = []
+    for issue in ijson.items(stream, "item"):
+        if issue.get("pull_request") is not None:
+            continue
+        rows.append(_issue_row(issue))
+        if len(rows) >= ISSUES_LIMIT:
+            break
+    return rows
 
 
 def issues(github_url: str) -> Union[Dict, Tuple[Dict, int]]:
-    # Validate URL format
-    if not GITHUB_URL_RE.match(github_url):
+    # Validate URL format and extract owner/repo in one pass
+    match = GITHUB_URL_RE.match(github_url)
+    if not match:
         return {"error": f"'{github_url}' is not a valid GitHub repository URL. Please use a URL like https://github.com/owner/repo."}, 400
-
-    github_url = normalize_github_url(github_url) or github_url
+    owner, repo = match.group("owner", "repo")
+    repo_name = f"{owner}/{repo}"
 
     try:
         token = os.getenv("GITHUB_TOKEN")
         if not token:
             return {"error": "GitHub token is not configured. Please set a GITHUB_TOKEN to access repositories."}, 403
 
-        # Parse github_url to extract owner/repo
-        parsed = urlparse(github_url)
-        path_parts = [p for p in parsed.path.strip("/").split("/") if p]
-        if len(path_parts) < 2:
-            return {"error": f"'{github_url}' is not a valid GitHub repository URL. Please use a URL like https://github.com/owner/repo."}, 400
-        owner = path_parts[0]
-        repo = path_parts[1]
-        repo_name = f"{owner}/{repo}"
-
-        g = Github(token)
-        repo_obj = g.get_repo(repo_name)
+        # Fetch repo metadata (for permissions) and open issues concurrently
+        session = _github_session(token)
+        repo_future = _executor.submit(_get_json, session, f"/repos/{repo_name}")
+        issues_future = _executor.submit(
+            _get_json, session, f"/repos/{repo_name}/issues", _parse_issues,
+            state="open", per_page=ISSUES_LIMIT,
+        )
+        wait((repo_future, issues_future))
+        repo_data = repo_future.result()
+        result = issues_future.result()
 
         # Check permissions
-        permissions = repo_obj.permissions
-        can_push = permissions.push if permissions else False
-
-        # Fetch issues (open only, limit to prevent timeouts)
-        github_issues = list(repo_obj.get_issues(state='open'))[:100]
-
-        result = []
-        for issue in github_issues:
-            if issue.pull_request is not None:
-                continue
-            result.append({
-                'issue_id': issue.number,
-                'issue_title': issue.title,
-                'body': issue.body or '',
-                'state': issue.state,
-                'author': issue.user.login if issue.user else 'unknown',
-                'author_avatar': issue.user.avatar_url if issue.user else '',
-                'labels': [
-                    {'name': label.name, 'color': label.color}
-                    for label in issue.labels
-                ],
-                'created_at': issue.created_at.isoformat() if issue.created_at else '',
-                'comment_count': issue.comments,
-            })
+        permissions = repo_data.get("permissions")
+        can_push = permissions.get("push", False) if permissions else False
 
         return {"issues": result, "can_push": can_push}
 
-    except GithubException as e:
-        if e.status in (401, 403, 404):
+    except requests.HTTPError as e:
+        status = e.response.status_code
+        if status in (401, 403, 404):
             return {"error": f"Cannot access repository '{repo_name}'. Your GitHub token may not have permission to view this repository, or the repository does not exist."}, 403
         logger.error("GitHub API error: %s", e)
-        return {"error": f"GitHub API error: {e.data.get('message', str(e)) if e.data else str(e)}"}, 403
+        try:
+            message = e.response.json().get("message", str(e))
+        except (ValueError, AttributeError):
+            message = str(e)
+        return {"error": f"GitHub API error: {message}"}, 403
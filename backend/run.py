@@ -1,7 +1,23 @@
-from app import create_app
+import signal
+
 from dotenv import load_dotenv
 
+# Load .env before importing the app: the Devin client reads its API key at import
 load_dotenv()
+
+from app import create_app  # noqa: E402
+from app.devin_client import refresh_credentials  # noqa: E402
+
+
+def _reload_credentials(_signum, _frame):
+    load_dotenv(override=True)
+    refresh_credentials()
+
+
+# SIGHUP reloads .env so a rotated DEVIN_API_KEY applies without a restart
+if hasattr(signal, "SIGHUP"):
+    signal.signal(signal.SIGHUP, _reload_credentials)
+
 app = create_app()
 
 if __name__ == "__main__":
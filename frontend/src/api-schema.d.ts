@@ -108,6 +108,26 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
+    "/api/devin/webhook": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get?: never;
+        put?: never;
+        /**
+         * Devin session callback
+         * @description Called by Devin when a session changes state; wakes the session's poller so the result is picked up immediately
+         */
+        post: operations["app.routes.devin.devin_webhook"];
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
 }
 export type webhooks = Record<string, never>;
 export interface components {
@@ -179,6 +199,10 @@ export interface components {
             fix_devin_url?: string | null;
             pr_url?: string | null;
         };
+        WebhookRequest: {
+            session_id: string;
+            status_enum?: string;
+        };
         ErrorResponse: {
             error: string;
         };
@@ -380,4 +404,26 @@ export interface operations {
             };
         };
     };
+    "app.routes.devin.devin_webhook": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        requestBody: {
+            content: {
+                "application/json": components["schemas"]["WebhookRequest"];
+            };
+        };
+        responses: {
+            /** @description Callback accepted */
+            204: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content?: never;
+            };
+        };
+    };
 }